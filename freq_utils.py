@@ -5,20 +5,56 @@ Word frequency counting for `tubelex` and `wikipedia-word-frequency-clean`.
 from typing import Optional, Union, TextIO
 from unicodedata import normalize as unicode_normalize
 from collections import Counter, defaultdict
-from collections.abc import Iterable, Sequence
+from collections.abc import Iterable, Sequence, Callable
 from enum import Enum
+from functools import lru_cache
 from zipfile import ZIP_DEFLATED, ZIP_BZIP2, ZIP_LZMA
 import gzip
 import bz2
 import lzma
 import argparse
 import sys
+from sys import intern
+
+# Word frequencies are Zipfian: most tokens repeat, so we memoize the (relatively
+# expensive) NFKC normalization for the frequent tokens. The cache is small (a few MB
+# per process): WordCounterGroup.add() already normalizes each unique word only once
+# per call.
+#
+# We deliberately use `unicodedata` rather than a faster external library
+# (e.g. utf8proc): the normalized lists then depend only on the Unicode version of
+# the Python interpreter (`unicodedata.unidata_version`).
+NORMALIZE_CACHE_SIZE = 1 << 16
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def _nfkc_cached(w: str) -> str:
+    return unicode_normalize('NFKC', w)
+
+
+# ASCII is a fixed point of NFKC, so we skip normalization (and the cache) for
+# ASCII-only words (str.isascii() is a constant time check):
+def _nfkc(w: str) -> str:
+    '''
+    >>> _nfkc('ﬁne'), _nfkc('Fine')
+    ('fine', 'Fine')
+    '''
+    return w if w.isascii() else _nfkc_cached(w)
+
+
+def _nfkc_lower(w: str) -> str:
+    '''
+    >>> _nfkc_lower('ＡＢＣ'), _nfkc_lower('ABC')
+    ('abc', 'abc')
+    '''
+    return w.lower() if w.isascii() else _nfkc_cached(w).lower()
+
 
 NORMALIZED_SUFFIX_FNS = (
     (False, '', None),
     (True, '-lower', lambda w: w.lower()),
-    (True, '-nfkc', lambda w: unicode_normalize('NFKC', w)),
-    (True, '-nfkc-lower', lambda w: unicode_normalize('NFKC', w).lower())
+    (True, '-nfkc', _nfkc),
+    (True, '-nfkc-lower', _nfkc_lower)
     )
 TOTAL_LABEL = '[TOTAL]'
 
@@ -132,11 +168,14 @@ class WordCounter:
     >>> p == m
     True
     '''
-    __slots__ = ('word_count', 'word_docn', 'word_channels', 'doc_words')
+    __slots__ = (
+        'word_count', 'word_docn', 'word_channels', 'doc_words', '_most_common'
+        )
     word_count: Counter[str]
     word_docn: Counter[str]                                     # documents or videos
     word_channels: Optional[dict[str, set[Union[int, str]]]]    # for tubelex (YouTube)
     doc_words: set[str]                                         # words in current doc
+    _most_common: Optional[list[tuple[str, int]]]               # see most_common()
 
     def __init__(self, channels: bool = False):
         super().__init__()
@@ -144,6 +183,7 @@ class WordCounter:
         self.word_docn      = Counter()
         self.word_channels  = defaultdict(set) if channels else None
         self.doc_words      = set()
+        self._most_common   = None
 
     def __eq__(self, other):
         return (
@@ -158,14 +198,48 @@ class WordCounter:
         words: Iterable[str],
         channel_id: Optional[Union[int, str]] = None
         ):
-        assert (channel_id is None) == (self.word_channels is None), (
-            channel_id, self.word_channels
+        word_channels = self.word_channels
+        assert (channel_id is None) == (word_channels is None), (
+            channel_id, word_channels
+            )
+        self._most_common = None
+        # Batched updates run in C (Counter.update() uses _count_elements()):
+        ws = words if isinstance(words, list) else list(words)
+        self.word_count.update(ws)
+        self.doc_words.update(ws)
+        if word_channels is not None:
+            for w in set(ws):
+                word_channels[w].add(channel_id)  # type: ignore
+
+    def add_doc(
+        self,
+        words: Iterable[str],
+        channel_id: Optional[Union[int, str]] = None
+        ):
+        '''
+        Add the words of a whole document, same as add() followed by close_doc(),
+        but without collecting the document's words in `doc_words`.
+
+        >>> c, d = WordCounter(), WordCounter()
+        >>> c.add('abca')
+        >>> c.close_doc()
+        >>> d.add_doc('abca')
+        >>> c == d
+        True
+        '''
+        assert not self.doc_words, 'add_doc() after add() without close_doc()'
+        word_channels = self.word_channels
+        assert (channel_id is None) == (word_channels is None), (
+            channel_id, word_channels
             )
-        for w in words:
-            self.word_count[w] += 1
-            self.doc_words.add(w)
-            if self.word_channels is not None:
-                self.word_channels[w].add(channel_id)  # type: ignore
+        self._most_common = None
+        ws = words if isinstance(words, list) else list(words)
+        self.word_count.update(ws)
+        uniq = set(ws)
+        self.word_docn.update(uniq)
+        if word_channels is not None:
+            for w in uniq:
+                word_channels[w].add(channel_id)  # type: ignore
 
     def close_doc(self):
         self.word_docn.update(self.doc_words)
@@ -173,15 +247,21 @@ class WordCounter:
 
     def remove_less_than_min_docs(self, min_docs: int):
         assert not self.doc_words, 'Missing `close_doc()`?'
-        for word, docn in self.word_docn.items():
-            if docn < min_docs:
-                del self.word_count[word]
+        # Rebuilding is faster than deleting word by word (and shrinks the dict):
+        self._most_common = None
+        w_docn = self.word_docn
+        self.word_count = Counter({
+            w: c for w, c in self.word_count.items() if w_docn[w] >= min_docs
+            })
 
     def remove_less_than_min_channels(self, min_channels: int):
         assert self.word_channels is not None
-        for word, channels in self.word_channels.items():
-            if len(channels) < min_channels:
-                del self.word_count[word]
+        self._most_common = None
+        w_channels = self.word_channels
+        self.word_count = Counter({
+            w: c for w, c in self.word_count.items()
+            if len(w_channels[w]) >= min_channels
+            })
 
     def warnings_for_markup(
         self,
@@ -189,7 +269,7 @@ class WordCounter:
         markup: Iterable[str] = DEFAULT_MARKUP,
         suffix: str = ''
         ):
-        top_words   = set(w for w, __ in self.word_count.most_common(top_n))
+        top_words   = set(w for w, __ in self.most_common()[:top_n])
         suffix_str  = f', in *{suffix}' if suffix else ''
         for w in top_words.intersection(markup):
             sys.stdout.write(
@@ -197,20 +277,37 @@ class WordCounter:
                 f'frequency {self.word_count[w]}{suffix_str}.\n'
                 )
 
+    def most_common(self) -> list[tuple[str, int]]:
+        '''
+        Return (word, count) pairs sorted by count (descending) like
+        `self.word_count.most_common()`. The result is cached, i.e. sorted only once
+        for both `warnings_for_markup()` and `dump()`, until the counts are modified
+        by `add()`, `merge()` or `remove_less_than_min_*()`.
+
+        >>> c = WordCounter()
+        >>> c.add('abb')
+        >>> c.most_common()
+        [('b', 2), ('a', 1)]
+        >>> c.add('aa')
+        >>> c.most_common()
+        [('a', 3), ('b', 2)]
+        '''
+        if self._most_common is None:
+            self._most_common = self.word_count.most_common()
+        return self._most_common
+
     def merge(self, other: 'WordCounter') -> 'WordCounter':
         assert not self.doc_words, 'Missing `self.close_doc()`?'
         assert not other.doc_words, 'Missing `other.close_doc()`?'
 
+        self._most_common = None
         self.word_count.update(other.word_count)
 
         # Documents have unique ids, we just add the counts:
 
-        wdn = self.word_docn
-        owd = other.word_docn
-        for w, od in owd.items():
-            wdn[w] += od
+        self.word_docn.update(other.word_docn)
 
-        # Merge sets of channels:
+        # Merge sets of channels (in-place set union):
 
         wc = self.word_channels
         owc = other.word_channels
@@ -221,7 +318,7 @@ class WordCounter:
                 if c is None:
                     wc[w] = oc
                 else:
-                    c.update(oc)
+                    c |= oc
         else:
             assert owc is None
 
@@ -251,7 +348,6 @@ class WordCounter:
         '''
         assert not self.doc_words, 'Missing `close_doc()`?'
 
-        w_count     = self.word_count
         w_docn      = self.word_docn
         w_channels  = self.word_channels
         n_numbers   = 2 if w_channels is None else 3
@@ -260,19 +356,24 @@ class WordCounter:
 
         line_format = '%s' + (f'{sep}%d' * n_numbers) + '\n'
 
-        words = sorted(w_count, key=w_count.__getitem__, reverse=True)
+        # Sorted (word, count) pairs, we do not need to look up the counts again:
+        word_counts = self.most_common()
+        docn        = w_docn.__getitem__
 
         f.write(sep.join(cols) + '\n')
+        # A single writelines() instead of a write() call per word, f-strings are
+        # faster than `line_format % ...`:
         if w_channels is None:
-            for word in words:
-                f.write(line_format % (
-                        word,  w_count[word], w_docn[word]
-                        ))
+            f.writelines(
+                f'{word}{sep}{count}{sep}{docn(word)}\n'
+                for word, count in word_counts
+                )
         else:
-            for word in words:
-                f.write(line_format % (
-                        word,  w_count[word], w_docn[word], len(w_channels[word])
-                        ))
+            channels = w_channels.__getitem__
+            f.writelines(
+                f'{word}{sep}{count}{sep}{docn(word)}{sep}{len(channels(word))}\n'
+                for word, count in word_counts
+                )
 
         f.write(line_format % (
             TOTAL_LABEL, *totals
@@ -295,16 +396,45 @@ class WordCounterGroup(dict[str, WordCounter]):
 
     def add(
         self,
-        words: Sequence[str],
+        words: Iterable[str],
         channel_id: Optional[Union[int, str]] = None
         ):
+        self._add(WordCounter.add, words, channel_id)
+
+    def add_doc(
+        self,
+        words: Iterable[str],
+        channel_id: Optional[Union[int, str]] = None
+        ):
+        '''
+        Add the words of a whole document, same as add() followed by close_doc().
+        '''
+        self._add(WordCounter.add_doc, words, channel_id)
+
+    def _add(
+        self,
+        add_fn: Callable[..., None],
+        words: Iterable[str],
+        channel_id: Optional[Union[int, str]]
+        ):
+        # Materialize once, shared by all counters. Interned words (and normalized
+        # words below) are stored as a single object across all counters/documents:
+        words = list(map(intern, words))
+        uniq = None
+        get = self.get
         for __, suffix, norm_fn in NORMALIZED_SUFFIX_FNS:
-            c = self.get(suffix)
-            if c is not None:
-                c.add(
-                    map(norm_fn, words) if (norm_fn is not None) else words,
-                    channel_id=channel_id
-                    )
+            c = get(suffix)
+            if c is None:
+                continue
+            if norm_fn is None:
+                add_fn(c, words, channel_id=channel_id)
+                continue
+            # Normalize each unique word only once, then remap all the words via
+            # dict lookups (in C):
+            if uniq is None:
+                uniq = set(words)
+            normalized = {w: intern(norm_fn(w)) for w in uniq}
+            add_fn(c, list(map(normalized.__getitem__, words)), channel_id=channel_id)
         self.n_words += len(words)
 
     def close_doc(self):
@@ -316,8 +446,20 @@ class WordCounterGroup(dict[str, WordCounter]):
             c.remove_less_than_min_docs(min_docs)
 
     def remove_less_than_min_channels(self, min_channels: int):
+        '''
+        >>> g = WordCounterGroup(normalize=False, channels=True)
+        >>> g.add(['a', 'b'], channel_id=1)
+        >>> g.close_doc()
+        >>> g.add(['a', 'b'], channel_id=1)
+        >>> g.close_doc()
+        >>> g.add(['a'], channel_id=2)
+        >>> g.close_doc()
+        >>> g.remove_less_than_min_channels(2)
+        >>> dict(g[''].word_count)
+        {'a': 3}
+        '''
         for c in self.values():
-            c.remove_less_than_min_docs(min_channels)
+            c.remove_less_than_min_channels(min_channels)
 
     def warnings_for_markup(
         self,
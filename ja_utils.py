@@ -2,14 +2,20 @@
 Japanese language processing for `tubelex` and `wikipedia-word-frequency-clean`.
 '''
 
-import fugashi  # type: ignore
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, TYPE_CHECKING
 import argparse
 import re
 
+if TYPE_CHECKING:
+    import fugashi  # type: ignore
+
 
 # Word matching (not just) for Japanese
+#
+# The get_re_*() functions are memoized: there is only a handful of distinct
+# arguments, and repeated calls skip the checks and compilation.
 
 
 def _assert_safe_for_re_range(s: str) -> None:
@@ -22,6 +28,7 @@ def _assert_safe_for_re_range(s: str) -> None:
     assert ('-' not in s) or s.endswith('-')
 
 
+@lru_cache(maxsize=32)
 def get_re_word(
     allow_start_end: str = '',
     allow_end: str = ''
@@ -42,24 +49,66 @@ def get_re_word(
 
     Useful both for space-separated languages (segmented with regex) and languages
     requiring more complex segmentation (Chinese, Japanese).
+
+    >>> re_word = get_re_word()
+    >>> all(re_word.fullmatch(w) for w in ['a', '亀', 'コアラ', 'Pú', 'A/B', 'bla-bla'])
+    True
+    >>> any(re_word.match(w) for w in ['', '1', 'a1', '1a', 'C3PIO', '/', '-', 'あ〜'])
+    False
+    >>> bool(get_re_word(allow_start_end=WAVE_DASH).match('あ〜'))
+    True
     '''
 
     _assert_safe_for_re_range(allow_start_end)
     _assert_safe_for_re_range(allow_end)
     assert '-' not in allow_end
 
+    # A single leading lookahead rejects any digit, after that no backtracking is
+    # needed to check for digits at the start/end:
+    return re.compile(
+        rf'^(?!\D*\d)[\w{allow_start_end}]'
+        rf'(?:\D*[\w{allow_end}{allow_start_end}])?$'
+        )
+
+
+@lru_cache(maxsize=32)
+def get_re_spaced_word(
+    allow_start_end: str = '',
+    allow_end: str = ''
+    ) -> re.Pattern:
+    '''
+    Find words matched by `get_re_word(allow_start_end, allow_end)` among tokens
+    separated by single spaces (e.g. MeCab -O wakati output), i.e. `findall()` is
+    equivalent to splitting on ' ' and filtering with `get_re_word().match`,
+    including the optional newline at the end of the last token:
+
+    >>> s = 'a 1 a1 b-b 〜 あ〜  C3PIO -x 亀\\n'
+    >>> get_re_spaced_word(WAVE_DASH).findall(s)
+    ['a', 'b-b', '〜', 'あ〜', '亀\\n']
+    >>> is_word = get_re_word(WAVE_DASH).match
+    >>> get_re_spaced_word(WAVE_DASH).findall(s) == list(filter(is_word, s.split(' ')))
+    True
+    '''
+    _assert_safe_for_re_range(allow_start_end)
+    _assert_safe_for_re_range(allow_end)
+    assert '-' not in allow_end
+
+    # Same as get_re_word(), with "^" and "$" replaced by space-delimited boundaries
+    # and no spaces inside:
     return re.compile(
-        rf'^(?!\d)[\w{allow_start_end}]'
-        rf'([^\d]*[\w{allow_end}{allow_start_end}])?(?<!\d)$'
+        rf'(?<![^ ])(?![^\d ]*\d)[\w{allow_start_end}]'
+        rf'(?:[^\d ]*[\w{allow_end}{allow_start_end}])?\n?(?= |\Z)'
         )
 
 
+@lru_cache(maxsize=1)
 def get_re_word_relaxed() -> re.Pattern:
     return re.compile(
         r'^([^\d]*(?!\d)[\w][^\d]*)$'
         )
 
 
+@lru_cache(maxsize=32)
 def get_re_split(no_split: str = '') -> re.Pattern:
     '''
     Match non-word sequences to split words. Such sequences may consist of:
@@ -68,6 +117,9 @@ def get_re_split(no_split: str = '') -> re.Pattern:
 
     For languages that can be segmented with a regex (not Chinese or Japanase).
     Also see `get_re_word()`.
+
+    >>> get_re_split().split("a.b  cč5dď-eé'ff1+2*3.5koala")
+    ['a', 'b', 'cč', 'dď', 'eé', 'ff', 'koala']
     '''
     _assert_safe_for_re_range(no_split)
 
@@ -75,22 +127,27 @@ def get_re_split(no_split: str = '') -> re.Pattern:
     return re.compile(rf'(?:[^\w{no_split}]|\d)+')
 
 
-WAVE_DASH   = '\u301C'  # 〜 may look like fullwidth tilde ～
-EN_DASH     = '\u2013'  # – may look like hyphen -
+@lru_cache(maxsize=32)
+def get_re_token(no_split: str = '') -> re.Pattern:
+    '''
+    Match words between the non-word sequences matched by `get_re_split(no_split)`,
+    i.e. `findall()` tokenizes in a single pass without empty strings:
+
+    >>> s = "a.b  cč5dď-eé'ff1+2*3.5koala"
+    >>> get_re_token().findall(s) == [w for w in get_re_split().split(s) if w]
+    True
+    >>> get_re_token("'").findall(s)
+    ['a', 'b', 'cč', 'dď', "eé'ff", 'koala']
+    '''
+    _assert_safe_for_re_range(no_split)
 
+    if not no_split:
+        return re.compile(r'[^\W\d]+')    # \w except \d
+    return re.compile(rf'(?:(?!\d)[\w{no_split}])+')
 
-# Examples (test):
-_re_word = get_re_word()
-_re_split = get_re_split()
-assert all(_re_word.fullmatch(w) for w in ['a', '亀', 'コアラ', 'Pú', 'A/B', 'bla-bla'])
-assert not any(
-    _re_word.match(w) for w in ['', '1', 'a1', '1a', 'C3PIO', '/', '-', 'あ〜']
-    )
-assert get_re_word(allow_start_end=WAVE_DASH).match('あ〜')
-assert (
-    _re_split.split('a.b  cč5dď-eé\'ff1+2*3.5koala') ==
-    ['a', 'b', 'cč', 'dď', 'eé', 'ff', 'koala']
-    )
+
+WAVE_DASH   = '\u301C'  # 〜 may look like fullwidth tilde ～
+EN_DASH     = '\u2013'  # – may look like hyphen -
 
 
 NORMALIZE_FULLWIDTH_TILDE: dict[int, int] = {
@@ -98,7 +155,9 @@ NORMALIZE_FULLWIDTH_TILDE: dict[int, int] = {
     }
 
 
-def fugashi_tagger(dicdir: Optional[str]) -> fugashi.GenericTagger:
+def fugashi_tagger(dicdir: Optional[str]) -> 'fugashi.GenericTagger':
+    # Imported lazily, importing fugashi loads libmecab:
+    import fugashi  # type: ignore
     if dicdir is None:
         return fugashi.Tagger('-O wakati')  # -d/-r supplied automatically
     # GenericTagger: we do not supply wrapper (not needed wor -O wakati)
@@ -122,7 +181,7 @@ def add_tagger_arg_group(
         )
 
 
-def tagger_from_args(args: argparse.Namespace) -> fugashi.GenericTagger:
+def tagger_from_args(args: argparse.Namespace) -> 'fugashi.GenericTagger':
     # We always specify dicdir EXPLICITLY
     if args.dicdir is not None:
         dicdir = args.dicdir
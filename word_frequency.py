@@ -1,22 +1,45 @@
 import sys
-import io
+import os
+import gzip
+from io import BytesIO
 import re
 from math import ceil
-from itertools import repeat
-from functools import reduce
+from itertools import repeat, islice, chain
+from functools import reduce, lru_cache, partial
 from shutil import which
-from multiprocessing import Pool, cpu_count
+from contextlib import nullcontext
+from multiprocessing import get_context, cpu_count
+from threading import Semaphore, Event, Thread
+from queue import Queue
 import subprocess
 import argparse
 from tqdm import tqdm  # type: ignore
-from ja_utils import get_re_word, get_re_split, get_re_word_relaxed, WAVE_DASH, \
-    add_tagger_arg_group, tagger_from_args, NORMALIZE_FULLWIDTH_TILDE
+from ja_utils import get_re_token, get_re_word_relaxed, WAVE_DASH, \
+    get_re_spaced_word, add_tagger_arg_group, tagger_from_args, \
+    NORMALIZE_FULLWIDTH_TILDE
 from freq_utils import Storage, WordCounterGroup
-from collections.abc import Sequence
-from typing import Optional
+from collections.abc import Sequence, Iterable, Iterator, Callable
+from typing import Optional, TypeVar
 
 DEFAULT_MIN_DOCS = 3
 EXTRACTOR_VERSION = '3.0.6'  # Checked due to wikiextractor quirkiness
+DOCS_PER_BATCH = 64          # Documents per task for --consumers
+READ_BLOCK_SIZE = 1 << 20    # Bytes read from wikiextractor at once
+PREFETCH_DOCS = 256          # Documents read ahead by a thread, see iter_prefetched()
+LINE_CACHE_SIZE = 1 << 14    # Tokenized lines memoized, see cache_short_lines()
+MAX_CACHED_LINE = 512
+EXTRACT_CACHE_SUFFIX = '.extracted.gz'  # see --extract-cache
+
+# NORMALIZE_FULLWIDTH_TILDE for whole blocks of UTF-8, see iter_lines():
+FULLWIDTH_TILDE_BYTES = tuple(
+    (chr(c).encode('utf-8'), chr(r).encode('utf-8'))
+    for c, r in NORMALIZE_FULLWIDTH_TILDE.items()
+    )
+
+# Fork on Linux (the default only up to Python 3.13): workers inherit the compiled REs
+# and imported modules. Elsewhere keep the platform default.
+mp_context = get_context('fork' if sys.platform.startswith('linux') else None)
+
 
 # The following markup is replaced with a space character.
 # In several cases we also use the RE to delete the content between the tags, e.g.
@@ -133,7 +156,9 @@ search_score_close  = RE_SCORE_CLOSE.search
 
 
 def repl_ruby(m: re.Match) -> str:
-    return sub_ruby_del('', m.group('content'))
+    content = m.group('content')
+    # Every RE_RUBY_DEL alternative starts with "<":
+    return sub_ruby_del('', content) if '<' in content else content
 
 
 def remove_markup(line: str) -> str:
@@ -180,65 +205,111 @@ def remove_markup(line: str) -> str:
     'nitrogen'
     >>> remove_markup('化学式 <chem>N_2</chem> で<ins>表され</ins>')
     '化学式   で 表され '
+
+    Lines without "<", "=" or "_" (most lines) cannot match and are returned as is:
+
+    >>> remove_markup('No markup here.')
+    'No markup here.'
+    >>> remove_markup('align=right DNAformula_20')
+    '  DNA '
     '''
-    return sub_ruby(repl_ruby, sub_markup(' ', line))
+    # Every RE_MARKUP alternative needs "<", "=" or "_", RE_RUBY needs "<ruby":
+    if '<' in line:
+        line = sub_markup(' ', line)
+        return sub_ruby(repl_ruby, line) if '<ruby' in line else line
+    if '=' in line or '_' in line:
+        return sub_markup(' ', line)
+    return line
 
 
 # The right single quote '’' (but not the left single quote) is allowed to occur
 # inside ‘...’ as long as it is surrounded by \w from both sides (\b’\b in the RE).
 # E.g. ‘It’s an apostrophe.’ => “It’s an apostrophe.”
 #
-# The following RE and replaceement function replaces:
-# 1. legit single quotes by double quotes
+# The following REs and function replace:
+# 1. right single quotes except legit paired single quotes
 # 2. primes that look like apostrophe
 RSQUOTE2APOS: dict[int, int] = {ord('’'): ord('\'')}
 
-RE_SMART_APOS     = re.compile(
-    # Preserve -- has group(1)
-    r'‘(([^‘’]*\b’\b)*[^‘’]*)’(?!s)|'   # paired single quotes, see `in_quotes` below
-    # Replace by apostrophe:
-    r'’|'                               # right single quote except pairs like above
+# Paired single quotes, group(1) is the text inside. (Unrolled as "X*(?:’X*)*" rather
+# than "(X*’)*X*", each quantifier can match in a single way.)
+RE_PAIRED_QUOTES    = re.compile(r'‘([^‘’]*(?:\b’\b[^‘’]*)*)’(?!s)')
+split_paired_quotes = RE_PAIRED_QUOTES.split  # optimization
+
+# Primes to be replaced outside paired single quotes:
+RE_PRIME_APOS   = re.compile(
     r'(?<=[A-Za-z]{2})′|'               # prime following at least two alphabet letters
     r'′(?=s)'                           # prime before 's'
     )
-sub_smart_apos   = RE_SMART_APOS.sub  # optimization
+sub_prime_apos  = RE_PRIME_APOS.sub  # optimization
 
 
-def repl_smart_apos(m: re.Match) -> str:
+def smart_apostrophe(s: str) -> str:
     '''
     Translates "smart" apostrophe (right single quote ’ or prime ′) to apostrophe '.
     Keeps legit "‘...’" or "a′" as is.
 
+    Right single quotes are replaced using `str.translate()`, primes using a plain
+    string replacement. Paired single quotes are found by splitting the string into
+    `[outside, inside, outside, ..., outside]`, so there is no Python callback per
+    match.
+
     Basic quotes/apostrophies:
 
-    >>> sub_smart_apos(repl_smart_apos, 'It’s me. It’s ‘you and me’.')
+    >>> smart_apostrophe('It’s me. It’s ‘you and me’.')
     "It's me. It's ‘you and me’."
+    >>> smart_apostrophe('It’s me. It’s you and me’.')
+    "It's me. It's you and me'."
 
     Trickier case (resolved using r'(?!s)'):
 
-    >>> sub_smart_apos(repl_smart_apos, '‘It’s A’ ‘and’ it’s B.')
+    >>> smart_apostrophe('‘It’s A’ ‘and’ it’s B.')
     "‘It's A’ ‘and’ it's B."
 
     Imperfect matching:
 
-    >>> sub_smart_apos(repl_smart_apos,
+    >>> smart_apostrophe(
     ...     'This isn‘t an apostrophe. ‘It’s an apostrophe.’ ‘This isn’t an apostrophe.'
     ...     )
     "This isn‘t an apostrophe. ‘It's an apostrophe.’ ‘This isn’t an apostrophe."
 
-    Primes:
+    Primes (kept inside paired single quotes):
 
-    >>> sub_smart_apos(repl_smart_apos, 'It′s an a′, it can′t be b′. Countries′ names.')
+    >>> smart_apostrophe('It′s an a′, it can′t be b′. Countries′ names.')
     "It's an a′, it can't be b′. Countries' names."
+    >>> smart_apostrophe('‘Countries′ names’ are countries′ names.')
+    "‘Countries′ names’ are countries' names."
+    >>> smart_apostrophe('Nothing ‘to replace.')
+    'Nothing ‘to replace.'
     '''
-
-    in_quotes = m.group(1)  # inside paired single quotes
-    return (
-        # Keep outer quotes, replace inner right single quotes using translate():
-        f'‘{in_quotes.translate(RSQUOTE2APOS)}’' if in_quotes is not None
-        # Replace other right single quotes or primes found by regex:
-        else '\''
+    has_prime = '′' in s
+    if '’' not in s:
+        # Nothing to translate, and no paired single quotes:
+        return sub_prime_apos('\'', s) if has_prime else s
+    if '‘' not in s:
+        s = s.translate(RSQUOTE2APOS)
+        return sub_prime_apos('\'', s) if has_prime else s
+
+    parts = split_paired_quotes(s)
+    parts[::2] = [
+        sub_prime_apos('\'', p) if '′' in p else p
+        for p in map(str.translate, parts[::2], repeat(RSQUOTE2APOS))
+        ]
+    # Keep outer quotes, replace inner right single quotes:
+    parts[1::2] = map(
+        '‘{}’'.format, map(str.translate, parts[1::2], repeat(RSQUOTE2APOS))
         )
+    return ''.join(parts)
+
+
+def available_cpus() -> int:
+    '''
+    CPUs available to this process (respects e.g. taskset or container limits).
+    '''
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on all platforms
+        return cpu_count()
 
 
 def parse() -> argparse.Namespace:
@@ -246,7 +317,7 @@ def parse() -> argparse.Namespace:
         description='Count word frequencies from a Wikipedia dump.'
         )
 
-    default_processes = cpu_count() - 1
+    default_processes = available_cpus() - 1
     parser.add_argument(
         '--processes', type=int, default=default_processes,
         help=(
@@ -261,6 +332,29 @@ def parse() -> argparse.Namespace:
             '(not wikiextractor processes, default: no limit).'
             )
         )
+    parser.add_argument(
+        '--consumers', type=int, default=0,
+        help=(
+            'Number of processes tokenizing and counting the output of wikiextractor '
+            'when the dump files are not processed by multiple workers (included '
+            'in --processes, default: 0, i.e. done by the main process).'
+            )
+        )
+
+    parser.add_argument(
+        '--extract-cache', type=str, default=None, metavar='DIR',
+        help=(
+            'Directory caching the (gzipped) wikiextractor output for each dump file, '
+            'reused by subsequent runs, e.g. with different options.'
+            )
+        )
+    parser.add_argument(
+        '--no-lbzip2', action='store_false', dest='lbzip2',
+        help=(
+            'Do not decompress .bz2 dump files with lbzip2 (used by default if '
+            'installed and at least 2 processes are left for wikiextractor).'
+            )
+        )
 
     lang_group = parser.add_mutually_exclusive_group(required=False)
     lang_group.add_argument(
@@ -395,8 +489,15 @@ def main() -> None:
         )
 
     if workers == 0:
-        counters = process(args, dumps, processes, show_progress=True)
+        counters = process(
+            args, dumps, processes, show_progress=True, consumers=args.consumers
+            )
     else:
+        if args.consumers:
+            sys.stderr.write(
+                'Warning: --consumers is ignored when the dump files are processed '
+                'by multiple workers (see --workers).\n'
+                )
         sys.stderr.write(
             f'Processing dump files in parallell with {workers} workers:\n'
             f' - {w_n_dumps} dump files per worker,\n'
@@ -412,7 +513,7 @@ def main() -> None:
             w_dumps,
             repeat(w_proc)
             )
-        with Pool(
+        with mp_context.Pool(
             workers,
             maxtasksperchild=1  # free resources after task is done
             ) as pool:
@@ -449,53 +550,345 @@ def process_star(
     return process(*args)
 
 
-def process(
-    args: argparse.Namespace,
-    # The following two parameters "override" args
-    dumps: Sequence[str],
-    processes: int,
-    show_progress=False
-    ) -> WordCounterGroup:
+def cache_short_lines(
+    tokenize_words: Callable[[str], list[str]]
+    ) -> Callable[[str], Sequence[str]]:
+    '''
+    Memoize `tokenize_words` for lines of at most MAX_CACHED_LINE characters, which
+    are often repeated boilerplate (template remnants, navigation, etc.). Longer
+    lines are rarely repeated and would only evict the short ones.
+
+    >>> tokenize_words = cache_short_lines(str.split)
+    >>> tokenize_words('a b'), tokenize_words('a b'), tokenize_words('x ' * 300)[:2]
+    (('a', 'b'), ('a', 'b'), ['x', 'x'])
+    '''
+    @lru_cache(maxsize=LINE_CACHE_SIZE)
+    def cached(line: str) -> tuple[str, ...]:
+        return tuple(tokenize_words(line))
+
+    def tokenize_words_cached(line: str) -> Sequence[str]:
+        return cached(line) if len(line) <= MAX_CACHED_LINE else tokenize_words(line)
+
+    return tokenize_words_cached
+
+
+def get_tokenize_words(args: argparse.Namespace) -> Callable[[str], Sequence[str]]:
+    '''
+    Returns a function that removes markup from a line, tokenizes it, and keeps only
+    words.
+    '''
+    if not (args.ja or args.zh or args.en):
+        # (implicitly) args.default
+        # Equivalent to splitting with get_re_split() and filtering out empty
+        # strings, but in a single pass:
+        find_words = get_re_token().findall
+
+        def find_tokenize_words(line: str) -> list[str]:
+            return find_words(remove_markup(line))
+
+        return cache_short_lines(find_tokenize_words)
+
     if args.ja:
         tagger_parse = tagger_from_args(args).parse
+        # Equivalent to splitting on ' ' and filtering with
+        # get_re_word(allow_start_end=WAVE_DASH), but in a single pass:
+        find_spaced_words = get_re_spaced_word(allow_start_end=WAVE_DASH).findall
 
-        def tokenize(s):
-            return tagger_parse(
-                s.translate(NORMALIZE_FULLWIDTH_TILDE)
-                ).split(' ')
+        # NORMALIZE_FULLWIDTH_TILDE has been applied when reading the dumps
+        def ja_tokenize_words(line: str) -> list[str]:
+            return find_spaced_words(tagger_parse(remove_markup(line)))
+
+        return ja_tokenize_words
+
+    if args.zh:
+        from jieba import cut  # type: ignore
+        # jieba yields whitespace separately from other tokens, so joining with ' '
+        # allows single-pass matching, equivalent to filtering with get_re_word():
+        find_spaced_words = get_re_spaced_word().findall
+
+        def zh_tokenize_words(line: str) -> list[str]:
+            return find_spaced_words(' '.join(cut(remove_markup(line))))
+
+        return zh_tokenize_words
 
+    assert args.en
+    from nltk.tokenize import word_tokenize  # type: ignore
+    if args.smart_apostrophe:
+        def tokenize(s):
+            return word_tokenize(smart_apostrophe(s))
     else:
-        if args.zh:
-            from jieba import cut as tokenize  # type: ignore
-        elif args.en:
-            from nltk.tokenize import word_tokenize  # type: ignore
-            if args.smart_apostrophe:
-                def tokenize(s):
-                    return word_tokenize(
-                        sub_smart_apos(repl_smart_apos, s)
-                        )
+        tokenize = word_tokenize
+
+    is_word = get_re_word_relaxed().match
+
+    def tokenize_words(line: str) -> list[str]:
+        return list(filter(
+            is_word,
+            tokenize(remove_markup(line))
+            ))
+
+    # Memoized like the default tokenization above:
+    return cache_short_lines(tokenize_words)
+
+
+def _normalize_lines(lines: bytes, replace: Sequence[tuple[bytes, bytes]]) -> bytes:
+    if b'\r' in lines:
+        lines = lines.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    for old, new in replace:
+        lines = lines.replace(old, new)
+    return lines
+
+
+def iter_lines(
+    read: Callable[[int], bytes],
+    block_size: int = READ_BLOCK_SIZE,
+    replace: Sequence[tuple[bytes, bytes]] = ()
+    ) -> Iterator[bytes]:
+    '''
+    Read binary lines in large blocks using `read(block_size)`, e.g.
+    `partial(os.read, fd)` for a pipe. Each block is split into lines by a single C
+    call. Like `io.TextIOWrapper`, b'\\r\\n' and b'\\r' end lines as well, and are
+    translated to b'\\n'. Optionally `replace` (old, new) byte strings in whole
+    blocks of complete lines, where they cannot be split (e.g. multi-byte UTF-8
+    characters).
+
+    >>> r, w = os.pipe()
+    >>> os.write(w, b'a\\r\\nbc\\rd\\n\\re'), os.close(w)
+    (10, None)
+    >>> list(iter_lines(partial(os.read, r), 2, replace=[(b'c', b'C')])), os.close(r)
+    ([b'a\\n', b'bC\\n', b'd\\n', b'\\n', b'e'], None)
+    '''
+    rest    = b''
+    while True:
+        block = read(block_size)
+        if not block:
+            break
+        end = block.rfind(b'\n') + 1
+        if not end:
+            rest += block
+            continue
+        # Complete lines, i.e. ending with b'\n', which also keeps b'\r\n' together:
+        lines = rest + block[:end]
+        rest = block[end:]
+        yield from BytesIO(_normalize_lines(lines, replace)).readlines()
+    if rest:
+        yield from BytesIO(_normalize_lines(rest, replace)).readlines()
+
+
+def tee_read(
+    read: Callable[[int], bytes],
+    write: Callable[[bytes], object]
+    ) -> Callable[[int], bytes]:
+    '''
+    Returns a `read` function that also writes the data read using `write`.
+    '''
+    def read_write(size: int) -> bytes:
+        data = read(size)
+        write(data)
+        return data
+    return read_write
+
+
+def iter_docs(lines: Iterable[bytes]) -> Iterator[tuple[Optional[str], list[str]]]:
+    '''
+    Split wikiextractor output (binary lines) into documents. Yields
+    `(doc_open, lines)`, where `doc_open` is the opening <doc ...> line. Document
+    boundaries are detected on bytes, only the lines that are kept are decoded.
+
+    >>> list(iter_docs([b'<doc id="1">\\n', b'a\\n', b'</doc>\\n', b'<doc id="2">\\n',
+    ...                 '<b>ž\\n'.encode(), b'</doc>\\n']))
+    [('<doc id="1">\\n', ['a\\n']), ('<doc id="2">\\n', ['<b>ž\\n'])]
+    '''
+    doc_open    = None
+    doc_lines: list[str] = []
+    for line in lines:
+        # Document boundaries:
+        if line.startswith(b'<'):
+            # We assume docs are properly closed and opened:
+            if line.startswith(b'<doc '):
+                doc_open = line.decode('utf-8')
+                continue
+            if line.startswith(b'</doc>'):
+                yield (doc_open, doc_lines)
+                doc_lines = []
+                continue
+            # Keep lines with any tag other than "doc":
+        doc_lines.append(line.decode('utf-8'))
+    if doc_lines:
+        # Unterminated last document:
+        yield (doc_open, doc_lines)
+
+
+def iter_text_lines(doc_open: Optional[str], lines: Iterable[str]) -> Iterator[str]:
+    '''
+    Yields the text lines of a document (`doc_open` is used only for warnings),
+    without <score>...</score> blocks.
+
+    >>> list(iter_text_lines(None, ['a <score>x\\n', 'y\\n', '</score> b\\n', 'c\\n']))
+    ['a ', ' b', 'c\\n']
+    '''
+    # Optimization (local names):
+    score_open  = search_score_open
+    score_close = search_score_close
+
+    in_score    = False    # inside <score>...</score> (ignored)
+    maybe_score = None
+    for line in lines:
+        # Ignore <score>...</score> blocks:
+        if in_score:
+            m = score_close(line)
+            if m is not None:
+                in_score    = False
+                maybe_score = None
+                line = m.group(1)       # after </score>
             else:
-                tokenize = word_tokenize
+                if maybe_score is not None:
+                    # the lines will be processed if we don't find </score>
+                    maybe_score.append(line)
+                continue                # ignore
+        elif '<' in line or '\\' in line:   # needed by any RE_SCORE_OPEN match
+            m  = score_open(line)
+            if m is not None:
+                before = m.group(1)       # before <score>
+                # Check if it isn't closed on the same line:
+                mc = score_close(line)
+                if mc is not None and mc.start() > m.start():
+                    # keep in_score = False
+                    line    = before + ' ' + m.group(1)  # + after </score>
+                else:
+                    # Check if maybe instead of actual <score>
+                    if m.group('maybe') is not None:
+                        maybe_score = [line]
+                    in_score    = True
+                    line        = before
+
+        yield line
+
+    if in_score:
+        if maybe_score is not None:
+            # maybe_score actually wasn't a score or both open
+            # and close tags were missing => process all
+            # supposed score lines:
+            sys.stderr.write(
+                f'Warning: Possible score without '
+                f'<score>...</score> tags in:\n{doc_open}\n'
+                f'Starts with:\n{maybe_score[0]}\n'
+                )
+            yield from maybe_score
         else:
-            # (implicitly) args.default
-            tokenize = get_re_split().split
-
-    re_word = (
-        get_re_word(allow_start_end=WAVE_DASH) if args.ja else
-        get_re_word() if (args.ja or args.zh) else
-        get_re_word_relaxed() if args.en else
-        None    # only filter out empty strings
-        )
-
-    # is_word = None => filter filters out false (empty strings):
-    is_word = re_word.match if (re_word is not None) else None
+            sys.stderr.write(
+                f'Warning: Ignored lines upto the end of '
+                f'article.  Missing </score> tag in:\n'
+                f'{doc_open}\n'
+                )
 
-    normalize       = '%' in args.output
 
+def count_docs(
+    docs: Iterable[tuple[Optional[str], Sequence[str]]],
+    tokenize_words: Callable[[str], Sequence[str]],
+    normalize: bool
+    ) -> WordCounterGroup:
     counters = WordCounterGroup(normalize=normalize, channels=False)
     # Optimization:
-    c_add           = counters.add
-    c_close_doc     = counters.close_doc
+    c_add_doc       = counters.add_doc
+
+    n_docs = 0
+    for doc_open, lines in docs:
+        # A single add_doc() per document:
+        c_add_doc(chain.from_iterable(
+            map(tokenize_words, iter_text_lines(doc_open, lines))
+            ))
+        n_docs += 1
+
+    counters.n_docs = n_docs
+
+    return counters
+
+
+T = TypeVar('T')
+
+
+def iter_prefetched(
+    iterable: Iterable[T],
+    max_pending: int = PREFETCH_DOCS
+    ) -> Iterator[T]:
+    '''
+    Iterate over `iterable` in a background thread, up to `max_pending` items ahead.
+    Exceptions are re-raised in the consuming thread.
+
+    >>> list(iter_prefetched(range(5), 2))
+    [0, 1, 2, 3, 4]
+    '''
+    q: Queue = Queue(max_pending)
+    end = object()
+
+    def read():
+        try:
+            for item in iterable:
+                q.put((item, None))
+        except BaseException as e:
+            q.put((end, e))
+        else:
+            q.put((end, None))
+
+    Thread(target=read, daemon=True).start()
+    get = q.get     # optimization
+    while True:
+        item, e = get()
+        if item is end:
+            if e is not None:
+                raise e
+            return
+        yield item
+
+
+# State of a consumer process, see `process()`:
+_consumer_tokenize_words: Optional[Callable[[str], Sequence[str]]] = None
+_consumer_normalize = False
+
+
+def _init_consumer(args: argparse.Namespace) -> None:
+    global _consumer_tokenize_words, _consumer_normalize
+    _consumer_tokenize_words    = get_tokenize_words(args)
+    _consumer_normalize         = '%' in args.output
+
+
+def _count_docs_in_consumer(
+    docs: Sequence[tuple[Optional[str], Sequence[str]]]
+    ) -> WordCounterGroup:
+    assert _consumer_tokenize_words is not None
+    return count_docs(docs, _consumer_tokenize_words, _consumer_normalize)
+
+
+def extract_cache_path(cache_dir: str, dump_name: str) -> str:
+    '''
+    Path of the cached wikiextractor output for `dump_name` in `cache_dir`. Besides
+    the file name, the key includes the size and modification time of the dump, so
+    that a different dump with the same name (or a modified dump) is not mixed up
+    with the cached one.
+    '''
+    st = os.stat(dump_name)
+    return os.path.join(
+        cache_dir,
+        f'{os.path.basename(dump_name)}-{st.st_size}-{st.st_mtime_ns}'
+        f'{EXTRACT_CACHE_SUFFIX}'
+        )
+
+
+def process(
+    args: argparse.Namespace,
+    # The following two parameters "override" args
+    dumps: Sequence[str],
+    processes: int,
+    show_progress=False,
+    consumers: int = 0
+    ) -> WordCounterGroup:
+    '''
+    Count words in `dumps`. If `consumers` > 0, the documents are tokenized and
+    counted in a pool of `consumers` processes, in batches of DOCS_PER_BATCH
+    documents. (Cannot be used within a worker process, which is daemonic.)
+    '''
+    normalize       = '%' in args.output
 
     cmd_path = which('wikiextractor')
     assert cmd_path is not None, (
@@ -516,99 +909,136 @@ def process(
             f'{EXTRACTOR_VERSION}, and may not work as expected versions.\n\n'
             )
 
-    n_docs = 0
-    iter_dumps = (
-        tqdm(desc='Processing dump files', iterable=dumps) if show_progress
-        else dumps
+    # Leave the remaining processes to the consumers:
+    extractor_processes = max(1, processes - 1 - consumers)
+
+    # wikiextractor reads the output of lbzip2 as /dev/fd/N, see below:
+    lbzip2_path = (
+        which('lbzip2')
+        if args.lbzip2 and extractor_processes >= 2 and os.path.isdir('/dev/fd')
+        else None
         )
-    for dump_name in iter_dumps:
-        cmd = (
-            cmd_path,
-            '--processes', str(processes - 1),
-            '--no-templates',   # faster
-            '-o', '-',          # output to stdout
-            # quirky way of turning off html-safe output for EXTRACTOR_VERSION==3.0.6:
-            '--html-safe', '',
-            dump_name)
-        with subprocess.Popen(cmd, stdout=subprocess.PIPE) as p:
-            assert p is not None, cmd
-            assert p.stdout is not None, (cmd, p)
-            with io.TextIOWrapper(p.stdout, encoding='utf-8') as p_out:
-                in_score    = False    # inside <score>...</score> (ignored)
-                maybe_score = None
-                doc_open    = None
-                for line in p_out:
-                    # Document boundaries:
-                    if line.startswith('<'):
-                        # We assume docs are properly closed and opened:
-                        if line.startswith('<doc '):
-                            doc_open = line
-                            continue
-                        if line.startswith('</doc>'):
-                            if in_score:
-                                if maybe_score is not None:
-                                    # maybe_score actually wasn't a score or both open
-                                    # and close tags were missing => process all
-                                    # supposed score lines:
-                                    sys.stderr.write(
-                                        f'Warning: Possible score without '
-                                        f'<score>...</score> tags in:\n{doc_open}\n'
-                                        f'Starts with:\n{maybe_score[0]}\n'
-                                        )
-                                    for line in maybe_score:
-                                        words = list(filter(
-                                            is_word,
-                                            tokenize(remove_markup(line))
-                                            ))
-                                        c_add(words)
-                                else:
-                                    sys.stderr.write(
-                                        f'Warning: Ignored lines upto the end of '
-                                        f'article.  Missing </score> tag in:\n'
-                                        f'{doc_open}\n'
-                                        )
-                                # also in case an actual <score> wasn't closed properly:
-                                in_score = False
-                            c_close_doc()
-                            n_docs += 1
-                            continue
-                        # Continue processing if any tag other than "doc":
-
-                    # Ignore <score>...</score> blocks:
-                    if in_score:
-                        m = search_score_close(line)
-                        if m is not None:
-                            in_score    = False
-                            maybe_score = None
-                            line = m.group(1)       # after </score>
-                        else:
-                            if maybe_score is not None:
-                                # the lines will be processed if we don't find </score>
-                                maybe_score.append(line)
-                            continue                # ignore
+    # lbzip2 gets its own share of the extractor processes:
+    bz_processes = extractor_processes // 2 if lbzip2_path is not None else 0
+
+    if args.extract_cache is not None:
+        os.makedirs(args.extract_cache, exist_ok=True)
+
+    def iter_dump_docs() -> Iterator[tuple[Optional[str], list[str]]]:
+        iter_dumps = (
+            tqdm(desc='Processing dump files', iterable=dumps) if show_progress
+            else dumps
+            )
+        replace = FULLWIDTH_TILDE_BYTES if args.ja else ()
+        for dump_name in iter_dumps:
+            cache_path = (
+                extract_cache_path(args.extract_cache, dump_name)
+                if args.extract_cache is not None else None
+                )
+            if cache_path is not None and os.path.exists(cache_path):
+                # Extracted by an earlier run:
+                with gzip.open(cache_path, 'rb') as f:
+                    yield from iter_docs(iter_lines(f.read, replace=replace))
+                continue
+
+            # Decompress .bz2 in parallel with lbzip2 (if installed), wikiextractor
+            # would decompress in a single thread:
+            bz_cmd = (
+                (lbzip2_path, '-d', '-c', '-n', str(bz_processes), dump_name)
+                if lbzip2_path is not None and dump_name.endswith('.bz2') else None
+                )
+            with (
+                subprocess.Popen(bz_cmd, stdout=subprocess.PIPE) if bz_cmd is not None
+                else nullcontext()
+                ) as p_bz:
+                # EXTRACTOR_VERSION==3.0.6 cannot read stdin (it open()s even '-'),
+                # instead we pass it the pipe from lbzip2 as a /dev/fd/N path:
+                bz_fds: tuple[int, ...] = ()
+                if p_bz is not None:
+                    assert p_bz.stdout is not None, (bz_cmd, p_bz)
+                    bz_fds = (p_bz.stdout.fileno(),)
+                cmd = (
+                    cmd_path,
+                    '--processes', str(
+                        extractor_processes - bz_processes if bz_fds
+                        else extractor_processes
+                        ),
+                    '--no-templates',   # faster
+                    '-o', '-',          # output to stdout
+                    # quirky way of turning off html-safe output for
+                    # EXTRACTOR_VERSION==3.0.6:
+                    '--html-safe', '',
+                    f'/dev/fd/{bz_fds[0]}' if bz_fds else dump_name
+                    )
+                with subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.PIPE,
+                    pass_fds=bz_fds
+                    ) as p:
+                    assert p is not None, cmd
+                    assert p.stdout is not None, (cmd, p)
+                    if p_bz is not None:
+                        assert p_bz.stdout is not None, (bz_cmd, p_bz)
+                        p_bz.stdout.close()  # only read by wikiextractor
+                    read = partial(os.read, p.stdout.fileno())
+                    if cache_path is None:
+                        yield from iter_docs(iter_lines(read, replace=replace))
                     else:
-                        m  = search_score_open(line)
-                        if m is not None:
-                            before = m.group(1)       # before <score>
-                            # Check if it isn't closed on the same line:
-                            mc = search_score_close(line)
-                            if mc is not None and mc.start() > m.start():
-                                # keep in_score = False
-                                line    = before + ' ' + m.group(1)  # + after </score>
-                            else:
-                                # Check if maybe instead of actual <score>
-                                if m.group('maybe') is not None:
-                                    maybe_score = [line]
-                                in_score    = True
-                                line        = before
-
-                    words = list(filter(
-                        is_word,
-                        tokenize(remove_markup(line))
-                        ))
-                    c_add(words)
+                        # Cache the raw output, written under a temporary name until
+                        # complete:
+                        with gzip.open(
+                            cache_path + '.tmp', 'wb', compresslevel=1
+                            ) as f_cache:
+                            yield from iter_docs(iter_lines(
+                                tee_read(read, f_cache.write), replace=replace
+                                ))
+            # Otherwise a failure would look like a dump without any documents:
+            if p.returncode:
+                raise subprocess.CalledProcessError(p.returncode, p.args)
+            if p_bz is not None and p_bz.returncode:
+                raise subprocess.CalledProcessError(p_bz.returncode, p_bz.args)
+            if cache_path is not None:
+                os.replace(cache_path + '.tmp', cache_path)
+
+    if not consumers:
+        docs = iter_dump_docs()
+        return count_docs(
+            # Read ahead while MeCab is tokenizing (in C, slowest of the tokenizers):
+            iter_prefetched(docs) if args.ja else docs,
+            get_tokenize_words(args),
+            normalize
+            )
 
-    counters.n_docs = n_docs
+    # The pool's task handler thread would read all the documents ahead, limit the
+    # number of pending batches:
+    pending = Semaphore(2 * consumers)
+    stop    = Event()
+
+    def iter_batches() -> Iterator[list[tuple[Optional[str], list[str]]]]:
+        it_docs = iter_dump_docs()
+        for batch in iter(lambda: list(islice(it_docs, DOCS_PER_BATCH)), []):
+            pending.acquire()
+            if stop.is_set():
+                return
+            yield batch
+
+    counters = WordCounterGroup(normalize=normalize, channels=False)
+    with mp_context.Pool(
+        consumers,
+        initializer=_init_consumer,
+        initargs=(args,)
+        ) as pool:
+        try:
+            for batch_counters in pool.imap_unordered(
+                _count_docs_in_consumer, iter_batches(), chunksize=1
+                ):
+                pending.release()
+                counters.merge(batch_counters)
+        finally:
+            # On error, the task handler thread may be waiting in iter_batches(),
+            # and terminating the pool would wait for it forever:
+            stop.set()
+            pending.release()
 
     return counters
 